@@ -2,8 +2,25 @@ import sys
 import os
 import random
 import time
-from collections import Counter
+import mmap
 import math
+import binascii
+import multiprocessing
+import weakref
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+# --- 可选依赖: 安装 Numba 时导出渲染使用编译内核 ---
+try:
+    import numba
+    from numba import njit, prange
+    # 内核在 QThread 中调用: TBB 线程层在此情形下会令进程退出时挂起，优先使用 OpenMP / workqueue
+    numba.config.THREADING_LAYER_PRIORITY = ["omp", "workqueue", "tbb"]
+except ImportError:
+    njit = None
+render_kernel = None
+score_kernel = None
 
 # --- Platform-specific imports for file sharing ---
 if sys.platform == "win32":
@@ -18,9 +35,9 @@ from PyQt6.QtWidgets import (
     QGraphicsPixmapItem, QScrollArea, QGridLayout
 )
 from PyQt6.QtCore import (
-    Qt, QThread, pyqtSignal, QRectF, QTimer, QSize
+    Qt, QThread, QObject, QRunnable, QThreadPool, pyqtSignal, QRect, QTimer, QSize
 )
-from PyQt6.QtGui import QColor, QPainter, QBrush, QPen, QFont, QImage, QPixmap, QIcon
+from PyQt6.QtGui import QColor, QPainter, QPen, QFont, QImage, QPixmap, QIcon
 
 # --- 全局样式与配置 ---
 class AppConfig:
@@ -29,7 +46,13 @@ class AppConfig:
     
     GRADIENT_START = QColor("#8E1616")
     GRADIENT_END = QColor("#FF6363")
+    GRADIENT_START_RGB = np.array(GRADIENT_START.getRgb()[:3], dtype=np.float64)
+    GRADIENT_END_RGB = np.array(GRADIENT_END.getRgb()[:3], dtype=np.float64)
+    # 渐变查找表: 第 i 项为 t = i / 255 处的颜色，任意评分着色只需一次索引
+    GRADIENT_STEPS = np.arange(256)[:, np.newaxis] / 255.0
+    GRADIENT_LUT = (GRADIENT_START_RGB * (1 - GRADIENT_STEPS) + GRADIENT_END_RGB * GRADIENT_STEPS).astype(np.uint8)
     COLOR_GLOW_START = QColor(Qt.GlobalColor.white)
+    GLOW_START_RGB = np.array(COLOR_GLOW_START.getRgb()[:3], dtype=np.float64)
     ANIMATION_DURATION_S = 0.6
     
     WINDOW_WIDTH = 1200
@@ -43,6 +66,8 @@ class AppConfig:
     TOTAL_POINTS = LOGICAL_WIDTH * LOGICAL_HEIGHT
     
     NUM_WORKERS = os.cpu_count() or 4
+    # Windows 上 ProcessPoolExecutor 最多 61 个工作进程，超出会直接抛 ValueError
+    NUM_SAMPLING_PROCESSES = min(NUM_WORKERS, 61) if sys.platform == "win32" else NUM_WORKERS
     BYTES_PER_SAMPLE = 8
     
     # 文件集配置
@@ -56,6 +81,15 @@ class AppConfig:
     SINGLE_FILE_DELAY_MS = 1
     FILESET_BATCH_SIZE = 500 
     FILESET_TIMER_MS = 50 
+    SAMPLE_BATCH_SIZE = 500
+    REFINE_BATCH_SIZE = 50
+    ADAPTIVE_CDF_INTERVAL = 8
+    SAMPLE_QUEUE_MAX_BATCHES = 400
+    SAMPLE_DRAIN_MS = 16
+    DETAILS_THROTTLE_MS = 16
+    DETAILS_CACHE_SIZE = 256
+    SEQUENTIAL_CHUNK_LIMIT = 64 * 1024
+    EXPORT_BAND_POINTS = 65536
 
     STYLESHEET = f"""
         QDialog, QMainWindow {{
@@ -113,71 +147,166 @@ class AppConfig:
     """
 
 # --- Windows-specific shared open function ---
-def open_file_for_shared_read(filepath):
+def open_file_for_shared_read(filepath, random_access=False):
     if sys.platform == "win32":
         try:
+            flags = win32con.FILE_FLAG_RANDOM_ACCESS if random_access else win32con.FILE_ATTRIBUTE_NORMAL
             handle = win32file.CreateFile(
                 filepath, win32con.GENERIC_READ,
                 win32con.FILE_SHARE_READ | win32con.FILE_SHARE_WRITE | win32con.FILE_SHARE_DELETE,
-                None, win32con.OPEN_EXISTING, win32con.FILE_ATTRIBUTE_NORMAL, None
+                None, win32con.OPEN_EXISTING, flags, None
             )
             fd = msvcrt.open_osfhandle(handle.Detach(), os.O_RDONLY)
             return os.fdopen(fd, 'rb')
         except Exception: return None
     else:
-        return open(filepath, 'rb')
-
-# --- 渲染工人 (主界面) ---
-class RenderWorker(QThread):
-    point_sampled = pyqtSignal(int, int, int)
-    initial_pass_finished = pyqtSignal()
-
-    def __init__(self, file_path, initial_coords, chunk_size, logical_height, is_persistent=False):
-        super().__init__()
-        self.file_path = file_path
-        self.initial_coords = initial_coords
-        self.chunk_size = chunk_size
-        self.logical_height = logical_height
-        self.is_persistent = is_persistent
-        self.is_running = True
-
-    def sample_point(self, f, x, y):
-        index = x * self.logical_height + y
-        region_start = int(index * self.chunk_size)
-        max_offset = max(0, self.chunk_size - AppConfig.BYTES_PER_SAMPLE)
-        sample_pos = region_start + random.randint(0, int(max_offset))
-        f.seek(sample_pos)
-        data = f.read(AppConfig.BYTES_PER_SAMPLE)
-        if data:
-            score = len(set(data))
-            self.point_sampled.emit(x, y, score)
-
-    def run(self):
-        try:
-            with open_file_for_shared_read(self.file_path) as f:
-                if f is None: return
-                
-                for x, y in self.initial_coords:
-                    if not self.is_running: return
-                    self.sample_point(f, x, y)
-                
-                if self.is_persistent:
-                    self.initial_pass_finished.emit()
-                    while self.is_running:
-                        rand_x = random.randint(0, AppConfig.LOGICAL_WIDTH - 1)
-                        rand_y = random.randint(0, AppConfig.LOGICAL_HEIGHT - 1)
-                        self.sample_point(f, rand_x, rand_y)
-                        self.msleep(AppConfig.SINGLE_FILE_DELAY_MS)
-
-        except Exception:
-            pass
-
-    def stop(self):
-        self.is_running = False
+        f = open(filepath, 'rb')
+        if random_access and hasattr(os, "posix_fadvise"):
+            # 随机小块读取时关闭内核预读，避免每次采样都拉入大段无用数据
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_RANDOM)
+        return f
+
+# --- 随机采样用的只读内存映射 ---
+def open_file_for_sampling(filepath, random_access=True, length=0):
+    # length 为 0 时映射整个文件；指定长度时映射固定前缀，其他程序继续追加写入不影响映射
+    f = open_file_for_shared_read(filepath, random_access)
+    if f is None: return None, None
+    try:
+        return f, mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ)
+    except Exception:
+        f.close()
+        raise
+
+# --- 样本评分: 样本中不同字节的种类数 ---
+def count_distinct_bytes_rows(samples):
+    # 对每行排序后统计相邻不同的位置，全程向量化，无需逐行建集合
+    s = np.sort(samples, axis=-1)
+    return (1 + (s[..., 1:] != s[..., :-1]).sum(axis=-1)).astype(np.uint8)
+
+def region_starts(indices, file_size, total_points):
+    # 整数均分文件: 前 remainder 个区域各多 1 字节，避免浮点区域大小和逐点取整
+    chunk_size, remainder = divmod(file_size, total_points)
+    return indices * chunk_size + np.minimum(indices, remainder)
+
+def sample_positions(indices, file_size, total_points, bytes_per_sample, rng):
+    # indices 为区域编号数组 (任意形状)，在每个区域内随机取一个样本起点
+    # rng 为调用方独占的 np.random.Generator，整批偏移一次生成，且不争用全局随机状态的锁
+    max_offset = max(0, file_size // total_points - bytes_per_sample)
+    positions = region_starts(indices, file_size, total_points) + rng.integers(0, max_offset + 1, indices.shape)
+    return np.minimum(positions, file_size - bytes_per_sample)
+
+def sample_scores(mm, indices, total_points, bytes_per_sample, rng):
+    data = np.frombuffer(mm, dtype=np.uint8)
+    positions = sample_positions(indices, data.size, total_points, bytes_per_sample, rng)
+    if score_kernel is not None:
+        # 编译内核直接在映射上逐样本计数，省去 (n, b) 的聚集拷贝与排序
+        scores = np.empty(positions.shape, dtype=np.uint8)
+        score_kernel(data, positions.ravel(), bytes_per_sample, scores.ravel())
+        return scores
+    return count_distinct_bytes_rows(data[positions[..., np.newaxis] + np.arange(bytes_per_sample)])
+
+if njit is not None:
+    # 打包后的程序没有可写的缓存目录，仅在源码运行时缓存编译结果
+    _cache_kernels = not getattr(sys, "frozen", False)
+
+    @njit(cache=_cache_kernels)
+    def distinct_bytes(data, p, b):
+        # 256 位的已出现集合放在 4 个 64 位字中，每个字节 O(1)，与样本长度无关
+        m0 = m1 = m2 = m3 = np.uint64(0)
+        score = 0
+        for k in range(b):
+            v = data[p + k]
+            bit = np.uint64(1) << np.uint64(v & 63)
+            w = v >> 6
+            if w == 0:
+                if not m0 & bit:
+                    m0 |= bit
+                    score += 1
+            elif w == 1:
+                if not m1 & bit:
+                    m1 |= bit
+                    score += 1
+            elif w == 2:
+                if not m2 & bit:
+                    m2 |= bit
+                    score += 1
+            elif not m3 & bit:
+                m3 |= bit
+                score += 1
+        return score
+
+    # 采样进程已按核心数并行，此内核保持单线程，避免线程过量
+    @njit(cache=_cache_kernels)
+    def score_kernel(data, positions, b, out):
+        for i in range(positions.size):
+            out[i] = distinct_bytes(data, positions[i], b)
+
+    @njit(parallel=True, cache=_cache_kernels)
+    def render_kernel(data, positions, b, lut, out):
+        for i in prange(positions.size):
+            score = distinct_bytes(data, positions[i], b)
+            idx = (score - 1) * 255 // (b - 1) if b > 1 else 127
+            out[i] = 0xFF000000 | (lut[idx, 0] << 16) | (lut[idx, 1] << 8) | lut[idx, 2]
+
+# --- 自适应精炼: 采样次数越少的单元格被抽中的概率越高 ---
+def build_sampling_cdf(counts):
+    return np.cumsum(1.0 / (1.0 + counts.ravel()))
+
+def draw_cells(cdf, size, rng):
+    return np.minimum(np.searchsorted(cdf, rng.random(size) * cdf[-1], side='right'), cdf.size - 1)
+
+# --- 采样进程池 (主界面) ---
+_sampling_pool = None
+_process_maps = {}
+_process_rng = np.random.default_rng()
+
+def get_sampling_pool():
+    global _sampling_pool
+    if _sampling_pool is None:
+        # 统一使用 spawn，避免在已有 Qt 线程的进程里 fork
+        _sampling_pool = ProcessPoolExecutor(max_workers=AppConfig.NUM_SAMPLING_PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+    return _sampling_pool
+
+def shutdown_sampling_pool():
+    global _sampling_pool
+    if _sampling_pool is not None:
+        _sampling_pool.shutdown(wait=False, cancel_futures=True)
+        _sampling_pool = None
+
+def _get_process_map(file_path, file_size):
+    # 每个进程只保留当前文件的映射，按选择文件时测得的大小定长映射，与界面的区域划分保持一致
+    key = (file_path, file_size)
+    entry = _process_maps.get(key)
+    if entry is None:
+        for f, mm in _process_maps.values():
+            mm.close()
+            f.close()
+        _process_maps.clear()
+        f, mm = open_file_for_sampling(file_path, length=file_size)
+        if f is None: raise OSError(f"无法打开文件: {file_path}")
+        # 采样访问默认是随机的: 关闭映射上的缺页预读
+        if hasattr(mm, "madvise"): mm.madvise(mmap.MADV_RANDOM)
+        entry = _process_maps[key] = (f, mm)
+    return entry[1]
+
+def sample_batch(file_path, file_size, indices, sequential=False):
+    mm = _get_process_map(file_path, file_size)
+    if not (sequential and hasattr(mm, "madvise")):
+        return sample_scores(mm, indices, AppConfig.TOTAL_POINTS, AppConfig.BYTES_PER_SAMPLE, _process_rng)
+    # 顺序批次覆盖一段连续区域: 按顺序读取并提前整段预读，代替逐页缺页
+    start, end = region_starts(np.array([indices.min(), indices.max() + 1]), file_size, AppConfig.TOTAL_POINTS).tolist()
+    start -= start % mmap.PAGESIZE
+    end = min(file_size, end + AppConfig.BYTES_PER_SAMPLE)
+    mm.madvise(mmap.MADV_SEQUENTIAL, start, end - start)
+    mm.madvise(mmap.MADV_WILLNEED, start, end - start)
+    try:
+        return sample_scores(mm, indices, AppConfig.TOTAL_POINTS, AppConfig.BYTES_PER_SAMPLE, _process_rng)
+    finally:
+        # 之后的精炼仍是随机访问，恢复该段的随机提示
+        mm.madvise(mmap.MADV_RANDOM, start, end - start)
 
 # --- 主工作线程 (单文件) ---
 class FileProcessorThread(QThread):
-    point_sampled = pyqtSignal(int, int, int)
     first_pass_fully_finished = pyqtSignal()
     progress_updated = pyqtSignal(int)
     error_occurred = pyqtSignal(str)
@@ -187,11 +316,12 @@ class FileProcessorThread(QThread):
         self.file_path = file_path
         self.is_persistent = is_persistent
         self.is_running = True
-        self.workers = []
-        self.points_processed = 0
-        self.finished_workers_count = 0
+        self.rng = np.random.default_rng()
+        # 采样结果 (xs, ys, scores) 直接入队，由界面定时器批量取出；deque 的 append/popleft 线程安全，无需加锁
+        self.sample_queue = deque(maxlen=AppConfig.SAMPLE_QUEUE_MAX_BATCHES)
 
     def run(self):
+        pending = {}
         try:
             if not os.path.exists(self.file_path):
                 self.error_occurred.emit("文件不存在")
@@ -202,115 +332,150 @@ class FileProcessorThread(QThread):
                 self.error_occurred.emit("文件太小，无法映射")
                 return
 
-            chunk_size = file_size / AppConfig.TOTAL_POINTS
-            all_coordinates = [(x, y) for y in range(AppConfig.LOGICAL_HEIGHT) for x in range(AppConfig.LOGICAL_WIDTH)]
-            random.shuffle(all_coordinates)
+            sequential = file_size // AppConfig.TOTAL_POINTS < AppConfig.SEQUENTIAL_CHUNK_LIMIT
+            # 采样顺序为区域编号数组，(x, y) = divmod(编号, LOGICAL_HEIGHT)
+            if sequential:
+                # 区域较小时相邻区域落在相同的磁盘页上: 按文件偏移顺序分批，每批顺序扫描一段连续区域
+                order = np.arange(AppConfig.TOTAL_POINTS, dtype=np.int64)
+            else:
+                order = self.rng.permutation(AppConfig.TOTAL_POINTS)
             
-            coords_per_worker = (AppConfig.TOTAL_POINTS + AppConfig.NUM_WORKERS - 1) // AppConfig.NUM_WORKERS
-            coord_chunks = [all_coordinates[i:i + coords_per_worker] for i in range(0, AppConfig.TOTAL_POINTS, coords_per_worker)]
-
-            for chunk in coord_chunks:
+            pool = get_sampling_pool()
+            for i in range(0, AppConfig.TOTAL_POINTS, AppConfig.SAMPLE_BATCH_SIZE):
                 if not self.is_running: return
-                worker = RenderWorker(self.file_path, chunk, chunk_size, AppConfig.LOGICAL_HEIGHT, self.is_persistent)
-                worker.point_sampled.connect(self.handle_sample)
-                if self.is_persistent:
-                    worker.initial_pass_finished.connect(self.handle_worker_finished_initial_pass)
-                self.workers.append(worker)
-                worker.start()
+                indices = order[i:i + AppConfig.SAMPLE_BATCH_SIZE]
+                xs, ys = np.divmod(indices, AppConfig.LOGICAL_HEIGHT)
+                pending[pool.submit(sample_batch, self.file_path, file_size, indices, sequential)] = (xs, ys)
             
-            if not self.is_persistent:
-                for worker in self.workers:
-                    worker.wait()
-                self.first_pass_fully_finished.emit()
+            points_processed = 0
+            for future in as_completed(pending):
+                if not self.is_running: return
+                xs, ys = pending[future]
+                self.sample_queue.append((xs, ys, future.result()))
+                points_processed += len(xs)
+                self.progress_updated.emit(int(points_processed / AppConfig.TOTAL_POINTS * 100))
+            self.first_pass_fully_finished.emit()
+            
+            # 首轮已覆盖每个单元格一次；之后按 1/(1+采样次数) 加权抽取，抽样分布每隔若干轮重建
+            sample_counts = np.ones(AppConfig.TOTAL_POINTS)
+            refine_rounds = 0
+            while self.is_persistent and self.is_running:
+                if refine_rounds % AppConfig.ADAPTIVE_CDF_INTERVAL == 0:
+                    cdf = build_sampling_cdf(sample_counts)
+                refine_rounds += 1
+                pending = {}
+                for _ in range(AppConfig.NUM_SAMPLING_PROCESSES):
+                    indices = draw_cells(cdf, AppConfig.REFINE_BATCH_SIZE, self.rng)
+                    np.add.at(sample_counts, indices, 1)
+                    xs, ys = np.divmod(indices, AppConfig.LOGICAL_HEIGHT)
+                    pending[pool.submit(sample_batch, self.file_path, file_size, indices)] = (xs, ys)
+                for future in as_completed(pending):
+                    if not self.is_running: return
+                    xs, ys = pending[future]
+                    self.sample_queue.append((xs, ys, future.result()))
+                self.msleep(AppConfig.SINGLE_FILE_DELAY_MS * AppConfig.REFINE_BATCH_SIZE)
 
         except Exception as e:
             self.error_occurred.emit(f"处理文件时出错: {e}")
-
-    def handle_sample(self, x, y, score):
-        if self.finished_workers_count < len(self.workers):
-            self.points_processed += 1
-            progress = int(self.points_processed / AppConfig.TOTAL_POINTS * 100)
-            self.progress_updated.emit(progress)
-        self.point_sampled.emit(x, y, score)
-
-    def handle_worker_finished_initial_pass(self):
-        self.finished_workers_count += 1
-        if self.finished_workers_count == len(self.workers):
-            self.first_pass_fully_finished.emit()
+            shutdown_sampling_pool()
+        finally:
+            for future in pending:
+                future.cancel()
 
     def stop(self):
         self.is_running = False
-        for worker in self.workers:
-            worker.stop()
-            worker.wait()
 
 # --- 可视化区域控件 (主窗口和文件集通用) ---
 class VisualizationWidget(QWidget):
+    # 所有实例共用一个动画定时器，仅在有可见控件存在发光动画时运行
+    _animation_timer = None
+    _animating_widgets = weakref.WeakSet()
+
     def __init__(self, logical_width, logical_height):
         super().__init__()
         self.logical_width = logical_width
         self.logical_height = logical_height
         self.setFixedSize(logical_width * AppConfig.CELL_SIZE, logical_height * AppConfig.CELL_SIZE)
         
-        self.grid_stats = {}
+        # 每个单元格的统计以连续数组保存: total_score/count 以 [x, y] 索引，color_rgb 按图像行存放 [y, x]
+        self.total_score = np.zeros((logical_width, logical_height), dtype=np.float64)
+        self.count = np.zeros((logical_width, logical_height), dtype=np.uint32)
+        self.color_rgb = np.empty((logical_height, logical_width, 3), dtype=np.uint8)
+        self.color_rgb[:] = AppConfig.COLOR_BACKGROUND.getRgb()[:3]
+        # color_rgb 只做原地修改，QImage 直接包装其内存，绘制时无需任何转换或逐格状态切换
+        self.color_image = QImage(self.color_rgb.data, logical_width, logical_height, logical_width * 3, QImage.Format.Format_RGB888)
         self.active_glows = {}
-        self.animation_timer = QTimer(self)
-        self.animation_timer.timeout.connect(self._tick_animations)
-        self.animation_timer.start(16)
 
-    def _interpolate_color(self, start_color, end_color, t):
-        r = int(start_color.red() * (1 - t) + end_color.red() * t)
-        g = int(start_color.green() * (1 - t) + end_color.green() * t)
-        b = int(start_color.blue() * (1 - t) + end_color.blue() * t)
-        return QColor(r, g, b)
+    @classmethod
+    def _schedule_animation(cls, widget):
+        cls._animating_widgets.add(widget)
+        if cls._animation_timer is None:
+            cls._animation_timer = QTimer()
+            cls._animation_timer.timeout.connect(cls._tick_all_animations)
+        if not cls._animation_timer.isActive(): cls._animation_timer.start(16)
+
+    @classmethod
+    def _tick_all_animations(cls):
+        for widget in list(cls._animating_widgets):
+            widget._tick_animations()
+            if not widget.active_glows: cls._animating_widgets.discard(widget)
+        if not cls._animating_widgets: cls._animation_timer.stop()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.active_glows: self._schedule_animation(self)
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self._animating_widgets.discard(self)
+        if not self._animating_widgets and self._animation_timer is not None: self._animation_timer.stop()
 
     def _tick_animations(self):
         if not self.active_glows: return
-        current_time = time.monotonic()
-        finished_glows = []
-        for pos, data in self.active_glows.items():
-            elapsed = current_time - data['start_time']
-            t = min(1.0, elapsed / AppConfig.ANIMATION_DURATION_S)
-            current_color = self._interpolate_color(AppConfig.COLOR_GLOW_START, data['end_color'], t)
-            if pos in self.grid_stats: self.grid_stats[pos]['display_color'] = current_color
-            if t >= 1.0: finished_glows.append(pos)
-        for pos in finished_glows: del self.active_glows[pos]
-        self.update()
+        # active_glows: (x, y) -> (开始时间, 目标颜色在 GRADIENT_LUT 中的下标)，整批插值写入 color_rgb
+        xs, ys = np.array(list(self.active_glows.keys())).T
+        start_times, color_indices = np.array(list(self.active_glows.values())).T
+        t = np.minimum(1.0, (time.monotonic() - start_times) / AppConfig.ANIMATION_DURATION_S)[:, np.newaxis]
+        end_rgb = AppConfig.GRADIENT_LUT[color_indices.astype(np.intp)]
+        self.color_rgb[ys, xs] = (AppConfig.GLOW_START_RGB * (1 - t) + end_rgb * t).astype(np.uint8)
+        
+        for x, y in zip(xs[t[:, 0] >= 1.0].tolist(), ys[t[:, 0] >= 1.0].tolist()):
+            del self.active_glows[(x, y)]
+        # 只重绘正在动画的单元格所覆盖的区域
+        cell_size = AppConfig.CELL_SIZE
+        x0, y0 = int(xs.min()), int(ys.min())
+        self.update(QRect(x0 * cell_size, y0 * cell_size, (int(xs.max()) - x0 + 1) * cell_size, (int(ys.max()) - y0 + 1) * cell_size))
 
-    def get_color_for_score(self, score):
-        t = (score - 1.0) / 7.0
-        return self._interpolate_color(AppConfig.GRADIENT_START, AppConfig.GRADIENT_END, t)
+    def get_color_indices(self, scores):
+        return np.clip((scores - 1.0) / 7.0 * 255, 0, 255).astype(np.uint8)
 
     def clear_grid(self):
         self.active_glows.clear()
-        self.grid_stats.clear()
+        self.total_score.fill(0)
+        self.count.fill(0)
+        self.color_rgb[:] = AppConfig.COLOR_BACKGROUND.getRgb()[:3]
         self.update()
 
-    def update_point_average(self, x, y, new_score):
-        pos = (x, y)
-        if pos not in self.grid_stats:
-            self.grid_stats[pos] = {'total_score': 0, 'count': 0, 'display_color': AppConfig.COLOR_BACKGROUND}
-        stats = self.grid_stats[pos]
-        new_count = stats['count'] + 1
-        new_total = stats['total_score'] + new_score
-        new_average_score = new_total / new_count
-        stats['total_score'] = new_total
-        stats['count'] = new_count
-        new_color = self.get_color_for_score(new_average_score)
-        if new_color != stats['display_color']:
-            self.active_glows[pos] = {'start_time': time.monotonic(), 'end_color': new_color}
+    def update_points(self, xs, ys, scores):
+        np.add.at(self.total_score, (xs, ys), scores)
+        np.add.at(self.count, (xs, ys), 1)
+        new_indices = self.get_color_indices(self.total_score[xs, ys] / self.count[xs, ys])
+        changed = np.any(AppConfig.GRADIENT_LUT[new_indices] != self.color_rgb[ys, xs], axis=1)
+        start_time = time.monotonic()
+        for x, y, idx in zip(xs[changed].tolist(), ys[changed].tolist(), new_indices[changed].tolist()):
+            self.active_glows[(x, y)] = (start_time, idx)
+        if self.active_glows and self.isVisible(): self._schedule_animation(self)
 
     def paintEvent(self, event):
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        if not self.grid_stats:
-            painter.fillRect(self.rect(), AppConfig.COLOR_BACKGROUND)
-            return
         cell_size = AppConfig.CELL_SIZE
-        for (x, y), stats in self.grid_stats.items():
-            painter.setBrush(QBrush(stats['display_color']))
-            painter.setPen(Qt.PenStyle.NoPen)
-            painter.drawRect(QRectF(x * cell_size, y * cell_size, cell_size, cell_size))
+        r = event.rect()
+        x0, y0 = max(0, r.left() // cell_size), max(0, r.top() // cell_size)
+        x1 = min(self.logical_width, r.right() // cell_size + 1)
+        y1 = min(self.logical_height, r.bottom() // cell_size + 1)
+        if x1 <= x0 or y1 <= y0: return
+        source = QRect(x0, y0, x1 - x0, y1 - y0)
+        painter.drawImage(QRect(x0 * cell_size, y0 * cell_size, source.width() * cell_size, source.height() * cell_size), self.color_image, source)
 
 # --- 文件集浏览器相关 ---
 class FileGridWidget(QWidget):
@@ -333,44 +498,31 @@ class FileGridWidget(QWidget):
         layout.addWidget(self.vis_widget)
         layout.addWidget(self.filename_label)
 
-    def update_pixel(self, x, y, score):
-        self.vis_widget.update_point_average(x, y, score)
+    def update_pixels(self, xs, ys, scores):
+        self.vis_widget.update_points(xs, ys, scores)
 
-class FileSetBatchWorker(QThread):
-    point_sampled = pyqtSignal(str, int, int, int)
+class FileSetBatchSignals(QObject):
+    samples_ready = pyqtSignal(str, object, object, object)
 
-    def __init__(self, samples_to_process):
+class FileSetBatchWorker(QRunnable):
+    def __init__(self, samples_by_file, signals):
         super().__init__()
-        self.samples_to_process = samples_to_process
-        self.is_running = True
+        # 文件路径 -> 区域编号数组，由 FileSetWindow 分组好后交给工人，无需再扫描
+        self.samples_by_file = samples_by_file
+        self.signals = signals
+        self.rng = np.random.default_rng()
 
     def run(self):
         try:
-            for file_path in Counter(s[0] for s in self.samples_to_process):
-                with open_file_for_shared_read(file_path) as f:
-                    if f is None: continue
-                    
-                    file_size = os.fstat(f.fileno()).st_size
-                    chunk_size = file_size / AppConfig.GRID_TOTAL_POINTS
-                    
-                    for path, x, y in self.samples_to_process:
-                        if path != file_path or not self.is_running: continue
-                        
-                        index = x * AppConfig.GRID_CELL_LOGICAL_HEIGHT + y
-                        region_start = int(index * chunk_size)
-                        max_offset = max(0, chunk_size - AppConfig.BYTES_PER_SAMPLE)
-                        sample_pos = region_start + random.randint(0, int(max_offset))
-                        
-                        f.seek(sample_pos)
-                        data = f.read(AppConfig.BYTES_PER_SAMPLE)
-                        if data:
-                            score = len(set(data))
-                            self.point_sampled.emit(file_path, x, y, score)
+            for file_path, indices in self.samples_by_file.items():
+                f, mm = open_file_for_sampling(file_path)
+                if f is None: continue
+                with f, mm:
+                    xs, ys = np.divmod(indices, AppConfig.GRID_CELL_LOGICAL_HEIGHT)
+                    scores = sample_scores(mm, indices, AppConfig.GRID_TOTAL_POINTS, AppConfig.BYTES_PER_SAMPLE, self.rng)
+                    self.signals.samples_ready.emit(file_path, xs, ys, scores)
         except Exception:
             pass
-            
-    def stop(self):
-        self.is_running = False
 
 class FileSetProcessorThread(QThread):
     file_discovered = pyqtSignal(str)
@@ -403,7 +555,12 @@ class FileSetWindow(QDialog):
         self.file_widgets = {}
         self.file_counter = 0
         self.render_states = {}
-        self.active_batch_workers = []
+        # 常驻线程池: 每个定时周期只提交任务，不再反复创建和销毁线程
+        self.batch_pool = QThreadPool(self)
+        self.batch_pool.setMaxThreadCount(AppConfig.NUM_WORKERS)
+        self.batch_signals = FileSetBatchSignals(self)
+        self.batch_signals.samples_ready.connect(self.update_file_pixels)
+        self.sampling_rng = np.random.default_rng()
         
         self.sampling_timer = QTimer(self)
         self.sampling_timer.timeout.connect(self.trigger_sampling_batch)
@@ -462,11 +619,12 @@ class FileSetWindow(QDialog):
 
         self.file_widgets[file_path] = widget
         
-        coords = [(x, y) for y in range(AppConfig.GRID_CELL_LOGICAL_HEIGHT) for x in range(AppConfig.GRID_CELL_LOGICAL_WIDTH)]
-        random.shuffle(coords)
         self.render_states[file_path] = {
-            'shuffled_coords': coords,
-            'current_index': 0
+            'shuffled_indices': self.sampling_rng.permutation(AppConfig.GRID_TOTAL_POINTS),
+            'current_index': 0,
+            'first_pass_done': False,
+            'cdf': None,
+            'rounds': 0
         }
 
         self.file_counter += 1
@@ -484,42 +642,48 @@ class FileSetWindow(QDialog):
             self.sampling_timer.stop()
             return
         
-        finished_workers = [w for w in self.active_batch_workers if not w.isRunning()]
-        for worker in finished_workers:
-            self.active_batch_workers.remove(worker)
+        # 上一批任务尚未完成时跳过本周期，避免任务在队列中堆积
+        if self.batch_pool.activeThreadCount() >= AppConfig.NUM_WORKERS: return
 
-        samples_to_process = []
-        
-        if not self.render_states: return
+        samples_by_file = {}
         points_per_file_per_batch = max(1, AppConfig.FILESET_BATCH_SIZE // len(self.render_states))
 
         for file_path, state in self.render_states.items():
+            if state['first_pass_done']:
+                # 首轮之后按 1/(1+采样次数) 加权抽取，把 I/O 集中在尚未收敛的单元格上
+                if state['rounds'] % AppConfig.ADAPTIVE_CDF_INTERVAL == 0:
+                    state['cdf'] = build_sampling_cdf(self.file_widgets[file_path].vis_widget.count)
+                state['rounds'] += 1
+                samples_by_file[file_path] = draw_cells(state['cdf'], points_per_file_per_batch, self.sampling_rng)
+                continue
+            
             start_index = state['current_index']
             end_index = start_index + points_per_file_per_batch
             
-            chunk = state['shuffled_coords'][start_index:end_index]
-            samples_to_process.extend([(file_path, x, y) for x, y in chunk])
+            samples_by_file[file_path] = state['shuffled_indices'][start_index:end_index]
             
-            if end_index >= len(state['shuffled_coords']):
-                state['current_index'] = 0
-                random.shuffle(state['shuffled_coords'])
+            if end_index >= AppConfig.GRID_TOTAL_POINTS:
+                state['first_pass_done'] = True
             else:
                 state['current_index'] = end_index
 
-        coords_per_worker = (len(samples_to_process) + AppConfig.NUM_WORKERS - 1) // AppConfig.NUM_WORKERS
-        
-        for i in range(AppConfig.NUM_WORKERS):
-            chunk = samples_to_process[i * coords_per_worker: (i + 1) * coords_per_worker]
-            if not chunk: continue
-            
-            worker = FileSetBatchWorker(chunk)
-            worker.point_sampled.connect(self.update_file_pixel)
-            worker.start()
-            self.active_batch_workers.append(worker)
-
-    def update_file_pixel(self, file_path, x, y, score):
+        # 按总点数均分给各工人，每份仍按文件分组 (一个文件可能跨两个工人)
+        total = sum(len(indices) for indices in samples_by_file.values())
+        points_per_worker = (total + AppConfig.NUM_WORKERS - 1) // AppConfig.NUM_WORKERS
+        shard, room = {}, points_per_worker
+        for file_path, indices in samples_by_file.items():
+            while len(indices):
+                shard[file_path], indices = indices[:room], indices[room:]
+                room -= len(shard[file_path])
+                if room == 0:
+                    self.batch_pool.start(FileSetBatchWorker(shard, self.batch_signals))
+                    shard, room = {}, points_per_worker
+        if shard:
+            self.batch_pool.start(FileSetBatchWorker(shard, self.batch_signals))
+
+    def update_file_pixels(self, file_path, xs, ys, scores):
         if file_path in self.file_widgets:
-            self.file_widgets[file_path].update_pixel(x, y, score)
+            self.file_widgets[file_path].update_pixels(xs, ys, scores)
 
     def stop_all_threads(self):
         self.sampling_timer.stop()
@@ -527,11 +691,8 @@ class FileSetWindow(QDialog):
             self.processor_thread.stop()
             self.processor_thread.wait()
         
-        for worker in self.active_batch_workers:
-            if worker.isRunning():
-                worker.stop()
-                worker.wait()
-        self.active_batch_workers.clear()
+        self.batch_pool.clear()
+        self.batch_pool.waitForDone()
 
     def closeEvent(self, event):
         self.stop_all_threads()
@@ -639,20 +800,13 @@ class RenderWindow(QDialog):
         self.view.scale(factor, factor)
 
     def start_render(self):
-        self.render_thread = ExportRenderThread(self.config)
-        self.render_thread.point_rendered.connect(self.update_pixel)
-        self.render_thread.progress_updated.connect(self.progress_bar.setValue)
+        self.render_thread = ExportRenderThread(self.config, self.image)
+        self.render_thread.band_ready.connect(self.on_band_ready)
         self.render_thread.finished.connect(self.on_render_finished)
         self.render_thread.start()
 
-    def update_pixel(self, x, y, color):
-        self.image.setPixelColor(x, y, color)
-
-    def _interpolate_color(self, start_color, end_color, t):
-        r = int(start_color.red() * (1 - t) + end_color.red() * t)
-        g = int(start_color.green() * (1 - t) + end_color.green() * t)
-        b = int(start_color.blue() * (1 - t) + end_color.blue() * t)
-        return QColor(r, g, b)
+    def on_band_ready(self, y0, y1):
+        self.progress_bar.setValue(int(y1 / self.image.height() * 100))
 
     def update_pixmap(self):
         self.pixmap_item.setPixmap(QPixmap.fromImage(self.image))
@@ -668,44 +822,79 @@ class RenderWindow(QDialog):
         self.close()
 
 class ExportRenderThread(QThread):
-    point_rendered = pyqtSignal(int, int, QColor)
-    progress_updated = pyqtSignal(int)
+    band_ready = pyqtSignal(int, int)
 
-    def __init__(self, config):
+    def __init__(self, config, image):
         super().__init__()
         self.config = config
-        self.points_processed = 0
+        self.rng = np.random.default_rng()
+        # 直接写入 QImage 的像素缓冲区，界面由 RenderWindow 的定时器刷新
+        self.image = image
+        bits = image.bits()
+        bits.setsize(image.sizeInBytes())
+        self.pixels = np.frombuffer(bits, dtype=np.uint32).reshape(image.height(), -1)
 
     def run(self):
-        w, h, b, path = self.config['width'], self.config['height'], self.config['bytes'], self.config['file_path']
-        total_points = w * h
-        file_size = os.path.getsize(path)
-        chunk_size = file_size / total_points
-        
-        with open_file_for_shared_read(path) as f:
-            for y in range(h):
-                for x in range(w):
-                    index = x * h + y
-                    region_start = int(index * chunk_size)
-                    max_offset = max(0, chunk_size - b)
-                    sample_pos = region_start + random.randint(0, int(max_offset))
-                    f.seek(sample_pos)
-                    data = f.read(b)
-                    if data:
-                        score = len(set(data))
-                        t = (score - 1.0) / (b - 1.0) if b > 1 else 0.5
-                        color = self._interpolate_color(AppConfig.GRADIENT_START, AppConfig.GRADIENT_END, t)
-                        self.point_rendered.emit(x, y, color)
-            
-                    self.points_processed += 1
-                    progress = int(self.points_processed / total_points * 100)
-                    self.progress_updated.emit(progress)
-    
-    def _interpolate_color(self, start_color, end_color, t):
-        r = int(start_color.red() * (1 - t) + end_color.red() * t)
-        g = int(start_color.green() * (1 - t) + end_color.green() * t)
-        b = int(start_color.blue() * (1 - t) + end_color.blue() * t)
-        return QColor(r, g, b)
+        w, h, path = self.config['width'], self.config['height'], self.config['file_path']
+        
+        f, mm = open_file_for_sampling(path)
+        if f is None: return
+        with f, mm:
+            rows_per_band = max(1, AppConfig.EXPORT_BAND_POINTS // w)
+            for y0 in range(0, h, rows_per_band):
+                y1 = min(h, y0 + rows_per_band)
+                if render_kernel is not None:
+                    self._render_rows_compiled(mm, y0, y1)
+                else:
+                    self.pixels[y0:y1, :w] = self._render_rows(mm, y0, y1)
+                self.band_ready.emit(y0, y1)
+
+    def _band_indices(self, y0, y1):
+        w, h = self.config['width'], self.config['height']
+        # 像素 (x, y) 对应文件区域 x * h + y，与逐点版本保持一致
+        return np.arange(w, dtype=np.int64)[np.newaxis, :] * h + np.arange(y0, y1, dtype=np.int64)[:, np.newaxis]
+
+    def _render_rows_compiled(self, mm, y0, y1):
+        w, h, b = self.config['width'], self.config['height'], self.config['bytes']
+        data = np.frombuffer(mm, dtype=np.uint8)
+        positions = sample_positions(self._band_indices(y0, y1), data.size, w * h, b, self.rng)
+        render_kernel(data, positions.ravel(), b, AppConfig.GRADIENT_LUT, self.pixels[y0:y1, :w].reshape(-1))
+
+    def _render_rows(self, mm, y0, y1):
+        w, h, b = self.config['width'], self.config['height'], self.config['bytes']
+        scores = sample_scores(mm, self._band_indices(y0, y1), w * h, b, self.rng)
+        t = (scores - 1.0) / (b - 1.0) if b > 1 else np.full(scores.shape, 0.5)
+        rgb = AppConfig.GRADIENT_LUT[(t * 255).astype(np.uint8)].astype(np.uint32)
+        return np.uint32(0xFF000000) | (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+
+# --- 详情样本读取: 在线程池中读取，冷页缺页不阻塞界面线程 ---
+_HEX_UPPER = bytes.maketrans(b"abcdef", b"ABCDEF")
+
+class SampleReadSignals(QObject):
+    sample_read = pyqtSignal(int, str)
+    read_failed = pyqtSignal(int, str)
+
+class SampleReadWorker(QRunnable):
+    def __init__(self, request_id, detail_file, detail_map, start, signals):
+        super().__init__()
+        self.request_id = request_id
+        self.fd = detail_file.fileno()
+        self.detail_map = detail_map
+        self.start = start
+        self.signals = signals
+
+    def run(self):
+        try:
+            if self.detail_map is None:
+                sample_data = os.pread(self.fd, AppConfig.BYTES_PER_SAMPLE, self.start)
+            else:
+                sample_data = self.detail_map[self.start:self.start + AppConfig.BYTES_PER_SAMPLE]
+            # 直接在字节串上转大写，省去 hex() 后再 upper() 的一次字符串复制
+            hex_data = binascii.hexlify(sample_data).translate(_HEX_UPPER).decode("ascii")
+        except Exception as e:
+            self.signals.read_failed.emit(self.request_id, str(e))
+            return
+        self.signals.sample_read.emit(self.request_id, hex_data)
 
 # --- 主窗口 ---
 class MainWindow(QMainWindow):
@@ -718,6 +907,32 @@ class MainWindow(QMainWindow):
         self.file_path = None
         self.render_thread = None
         self.file_set_window = None
+        self.drain_timer = QTimer(self)
+        self.drain_timer.timeout.connect(self.drain_samples)
+        self.detail_file = None
+        self.detail_map = None
+        self.file_size = 0
+        self.chunk_size = 0
+        self.chunk_remainder = 0
+        self.max_offset = 0
+        # 详情查询合并: 拖动时只处理间隔内最后一个单元格
+        self.pending_cell = None
+        self.details_timer = QTimer(self)
+        self.details_timer.setSingleShot(True)
+        self.details_timer.setInterval(AppConfig.DETAILS_THROTTLE_MS)
+        self.details_timer.timeout.connect(self.update_sample_details)
+        # 同一时刻最多一个读取在执行，过期请求按编号丢弃
+        self.details_request_id = 0
+        self.details_rng = random.Random()
+        # (x, y) -> 最近一次读到的样本十六进制串，来回拖动时重复经过的单元格无需再读文件
+        self.details_cache = OrderedDict()
+        self.details_cell = None
+        self.details_texts = {}
+        self.read_pool = QThreadPool(self)
+        self.read_pool.setMaxThreadCount(1)
+        self.read_signals = SampleReadSignals(self)
+        self.read_signals.sample_read.connect(self.on_sample_read)
+        self.read_signals.read_failed.connect(self.on_sample_read_failed)
         self.init_ui()
 
     def init_ui(self):
@@ -734,6 +949,7 @@ class MainWindow(QMainWindow):
         title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.vis_widget = VisualizationWidget(AppConfig.LOGICAL_WIDTH, AppConfig.LOGICAL_HEIGHT)
         self.vis_widget.mousePressEvent = self.show_sample_details
+        self.vis_widget.mouseMoveEvent = self.show_sample_details
         control_layout = QHBoxLayout()
         self.select_button = QPushButton("选择文件")
         self.select_button.clicked.connect(self.select_file)
@@ -797,9 +1013,36 @@ class MainWindow(QMainWindow):
         file_path, _ = QFileDialog.getOpenFileName(self, "选择一个文件")
         if file_path:
             self.file_path = file_path
+            self.open_detail_file()
             self.status_label.setText(f"渲染中: {os.path.basename(self.file_path)}")
             self.start_processing()
 
+    def open_detail_file(self):
+        self.close_detail_file()
+        self.details_request_id += 1
+        self.details_cache.clear()
+        try:
+            self.detail_file = open_file_for_shared_read(self.file_path, random_access=True)
+            if self.detail_file is not None:
+                # 有 pread 时只保留文件描述符: 定位读取无状态，且在系统调用中释放 GIL，冷页读盘不会连带卡住界面线程
+                # 没有 pread 的平台 (Windows) 改为切片常驻映射
+                if not hasattr(os, "pread"):
+                    self.detail_map = mmap.mmap(self.detail_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            self.close_detail_file()
+        # 区域划分只取决于文件大小，选择文件时算好，点击时不再 stat
+        self.file_size = os.fstat(self.detail_file.fileno()).st_size if self.detail_file is not None else 0
+        # 与 region_starts 相同的整数划分，详情显示的区域与采样线程一致
+        self.chunk_size, self.chunk_remainder = divmod(self.file_size, AppConfig.TOTAL_POINTS)
+        self.max_offset = max(0, self.chunk_size - AppConfig.BYTES_PER_SAMPLE)
+
+    def close_detail_file(self):
+        self.read_pool.clear()
+        self.read_pool.waitForDone()
+        if self.detail_map is not None: self.detail_map.close()
+        if self.detail_file is not None: self.detail_file.close()
+        self.detail_file, self.detail_map = None, None
+
     def start_processing(self):
         self.vis_widget.clear_grid()
         self.progress_bar.setValue(0)
@@ -807,11 +1050,20 @@ class MainWindow(QMainWindow):
         self.select_button.setEnabled(False)
 
         self.render_thread = FileProcessorThread(self.file_path)
-        self.render_thread.point_sampled.connect(self.vis_widget.update_point_average)
         self.render_thread.progress_updated.connect(self.progress_bar.setValue)
         self.render_thread.first_pass_fully_finished.connect(self.on_first_pass_finished)
         self.render_thread.error_occurred.connect(self.on_error)
         self.render_thread.start()
+        self.drain_timer.start(AppConfig.SAMPLE_DRAIN_MS)
+
+    def drain_samples(self):
+        queue = self.render_thread.sample_queue
+        batches = []
+        while queue:
+            batches.append(queue.popleft())
+        if batches:
+            xs, ys, scores = (np.concatenate(parts) for parts in zip(*batches))
+            self.vis_widget.update_points(xs, ys, scores)
 
     def on_first_pass_finished(self):
         self.progress_bar.setVisible(False)
@@ -824,46 +1076,70 @@ class MainWindow(QMainWindow):
         self.select_button.setEnabled(True)
 
     def show_sample_details(self, event):
-        if not self.file_path: return
+        if self.detail_file is None: return
         x = int(event.position().x() / AppConfig.CELL_SIZE)
         y = int(event.position().y() / AppConfig.CELL_SIZE)
-        
-        pos = (x, y)
-        stats = self.vis_widget.grid_stats.get(pos)
-        if stats:
-            avg_score = stats['total_score'] / stats['count']
-            self.details_stats_label.setText(f"采样次数: {stats['count']} | 平均熵: {avg_score:.2f}")
+        # 拖动到控件外时坐标越界 (负下标还会静默回绕到另一侧)
+        if not (0 <= x < AppConfig.LOGICAL_WIDTH and 0 <= y < AppConfig.LOGICAL_HEIGHT): return
+        self.pending_cell = (x, y)
+        if not self.details_timer.isActive(): self.details_timer.start()
+
+    def update_sample_details(self):
+        if self.detail_file is None or self.pending_cell is None: return
+        x, y = self.pending_cell
+        count = int(self.vis_widget.count[x, y])
+        if count:
+            avg_score = self.vis_widget.total_score[x, y] / count
+            self.set_details_text(self.details_stats_label, f"采样次数: {count} | 平均熵: {avg_score:.2f}")
         else:
-            self.details_stats_label.setText("采样次数: 0 | 平均熵: N/A")
-        file_size = os.path.getsize(self.file_path)
-        chunk_size = file_size / AppConfig.TOTAL_POINTS
+            self.set_details_text(self.details_stats_label, "采样次数: 0 | 平均熵: N/A")
         index = x * AppConfig.LOGICAL_HEIGHT + y
-        region_start = int(index * chunk_size)
-        self.details_coord_label.setText(f"坐标: ({x}, {y}), 文件区域: {region_start}")
-        try:
-            with open_file_for_shared_read(self.file_path) as f:
-                max_offset_in_region = max(0, chunk_size - AppConfig.BYTES_PER_SAMPLE)
-                random_offset = random.randint(0, int(max_offset_in_region))
-                f.seek(region_start + random_offset)
-                sample_data = f.read(AppConfig.BYTES_PER_SAMPLE)
-                hex_data = sample_data.hex().upper()
-                self.sample_labels[0].setText(f"新样本: {hex_data}")
-        except Exception as e:
-            self.details_coord_label.setText(f"无法读取文件详情: {e}")
+        region_start = index * self.chunk_size + min(index, self.chunk_remainder)
+        self.set_details_text(self.details_coord_label, f"坐标: ({x}, {y}), 文件区域: {region_start}")
+        self.details_request_id += 1
+        self.read_pool.clear()
+        hex_data = self.details_cache.get((x, y))
+        if hex_data is not None:
+            self.details_cache.move_to_end((x, y))
+            self.set_details_text(self.sample_labels[0], f"新样本: {hex_data}")
+            return
+        self.details_cell = (x, y)
+        start = region_start + self.details_rng.randrange(self.max_offset + 1)
+        self.read_pool.start(SampleReadWorker(self.details_request_id, self.detail_file, self.detail_map, start, self.read_signals))
+
+    def on_sample_read(self, request_id, hex_data):
+        if request_id != self.details_request_id: return
+        self.details_cache[self.details_cell] = hex_data
+        if len(self.details_cache) > AppConfig.DETAILS_CACHE_SIZE: self.details_cache.popitem(last=False)
+        self.set_details_text(self.sample_labels[0], f"新样本: {hex_data}")
+
+    def on_sample_read_failed(self, request_id, message):
+        if request_id != self.details_request_id: return
+        self.set_details_text(self.details_coord_label, f"无法读取文件详情: {message}")
+
+    def set_details_text(self, label, text):
+        # 停在同一单元格时文本往往不变，跳过对标签的重复设置
+        if self.details_texts.get(label) == text: return
+        self.details_texts[label] = text
+        label.setText(text)
 
     def stop_all_threads(self):
+        self.drain_timer.stop()
         if self.render_thread and self.render_thread.isRunning():
             self.render_thread.stop()
             self.render_thread.wait()
 
     def closeEvent(self, event):
         self.stop_all_threads()
+        self.close_detail_file()
+        shutdown_sampling_pool()
         if self.file_set_window:
             self.file_set_window.close()
         event.accept()
 
 # --- 程序入口 ---
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     app.setStyleSheet(AppConfig.STYLESHEET)
     window = MainWindow()